@@ -1,43 +1,47 @@
-import copy
+import asyncio
 import datetime
+import re
+import signal
 import sys
 import os
+import threading
 import time
 import argparse
-import traceback
 
-import pytz
-import syncthing
-from influxdb import InfluxDBClient
-import yaml
-from yaml2dataclass import Schema, SchemaPath
+import msgspec
+import msgspec.yaml
 
-from typing import Optional, Dict, Type, List
-from dataclasses import dataclass, asdict, field
+from typing import Optional, Dict, List, Tuple, TYPE_CHECKING
 
+# Client libraries are imported where they are used, so that --help and argument errors do not pay for them.
+if TYPE_CHECKING:
+    import ssl
+    import aiohttp
+    from influxdb import InfluxDBClient
 
-@dataclass
-class SyncthingConfiguration(Schema):
-    name: str
+
+class SyncthingConfiguration(msgspec.Struct, frozen=True, kw_only=True):
+    name: str = ""  # Filled in from the key of the syncthings section
     api_key: str
     host: str = 'localhost'
-    port: int = field(default=8384)
-    timeout: float = field(default=10.0)
-    is_https: bool = field(default=False)
-    ssl_cert_file: Optional[str] = field(default=None)
-    tags: Optional[List[str]] = field(default_factory=lambda: [])
+    port: int = 8384
+    timeout: float = 10.0
+    is_https: bool = False
+    ssl_cert_file: Optional[str] = None
+    tags: Optional[List[str]] = []
 
     def get_client_params(self):
-        result = asdict(self)
-        if "name" in result:
-            del result["name"]
-        if "tags" in result:
-            del result["tags"]
-        return result
+        return {
+            "api_key": self.api_key,
+            "host": self.host,
+            "port": self.port,
+            "timeout": self.timeout,
+            "is_https": self.is_https,
+            "ssl_cert_file": self.ssl_cert_file,
+        }
 
 
-@dataclass
-class InfluxDbConfiguration(Schema):
+class InfluxDbConfiguration(msgspec.Struct, frozen=True):
     host: str
     port: int  # Common ports: 443
     ssl: bool
@@ -47,46 +51,132 @@ class InfluxDbConfiguration(Schema):
     password: str
 
     def get_client_params(self):
-        result = asdict(self)
-        if "tags" in result:
-            del result["tags"]
-        return result
-
-
-@dataclass
-class MeasurementConfiguration(Schema):
+        return {
+            "host": self.host,
+            "port": self.port,
+            "ssl": self.ssl,
+            "verify_ssl": self.verify_ssl,
+            "database": self.database,
+            "username": self.username,
+            "password": self.password,
+        }
+
+
+class MeasurementConfiguration(msgspec.Struct, frozen=True):
     devices: str
     folders: str
 
 
-@dataclass
-class AppConfiguration(Schema):
+class AppConfiguration(msgspec.Struct, frozen=True):
     syncthings: Dict[str, SyncthingConfiguration]
     influxes: Dict[str, InfluxDbConfiguration]
     measurements: MeasurementConfiguration
 
-    @classmethod
-    def _load_dict(cls, props_dict, dest_cls: Type[Schema], add_name: bool = False):
-        result = {}
-        for name, value in props_dict.items():
-            arguments = {}
-            arguments.update(value)
-            if add_name:
-                arguments["name"] = name
-            result[name] = dest_cls.scm_load_from_dict(arguments)
-        return result
-
-    @classmethod
-    def scm_convert(cls, values: dict, path: SchemaPath):
-        values["syncthings"] = cls._load_dict(values["syncthings"], SyncthingConfiguration, True)
-        values["influxes"] = cls._load_dict(values["influxes"], InfluxDbConfiguration)
-        return values
-
 
 def load_app_config(stream) -> AppConfiguration:
     """Load application configuration from a stream."""
-    obj = yaml.safe_load(stream)
-    return AppConfiguration.scm_load_from_dict(obj)
+    result = msgspec.yaml.decode(stream.read(), type=AppConfiguration)
+    syncthings = {name: msgspec.structs.replace(sync, name=name) for name, sync in result.syncthings.items()}
+    return msgspec.structs.replace(result, syncthings=syncthings)
+
+
+# Parsed configurations by file path: (st_mtime, st_size, config)
+_config_cache: Dict[str, Tuple[float, int, AppConfiguration]] = {}
+
+
+def load_app_config_file(path: str) -> AppConfiguration:
+    """Load application configuration from a file, unless it did not change since the last load."""
+    st = os.stat(path)
+    cached = _config_cache.get(path)
+    if cached and cached[0] == st.st_mtime and cached[1] == st.st_size:
+        return cached[2]
+    with open(path, "r", encoding="utf-8") as stream:
+        result = load_app_config(stream)
+    _config_cache[path] = (st.st_mtime, st.st_size, result)
+    return result
+
+
+# SSL contexts with a client certificate loaded, by certificate file. Loading the certificate chain is expensive, so
+# contexts are shared by all clients using the same file, for the whole process.
+_ssl_contexts: Dict[str, "ssl.SSLContext"] = {}
+
+
+def get_ssl_context(ssl_cert_file: str) -> "ssl.SSLContext":
+    context = _ssl_contexts.get(ssl_cert_file)
+    if context is None:
+        import ssl
+        context = _ssl_contexts[ssl_cert_file] = ssl.create_default_context()
+        context.load_cert_chain(ssl_cert_file)
+    return context
+
+
+class SyncthingClient:
+    """Minimal asynchronous Syncthing REST client, on top of a shared aiohttp session."""
+
+    def __init__(self, session: "aiohttp.ClientSession", api_key: str, host: str = 'localhost', port: int = 8384,
+                 timeout: float = 10.0, is_https: bool = False, ssl_cert_file: Optional[str] = None):
+        import aiohttp
+        self.session = session
+        self.base_url = "%s://%s:%s" % ("https" if is_https else "http", host, port)
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.headers = {"X-API-Key": api_key}
+        self.ssl = get_ssl_context(ssl_cert_file) if ssl_cert_file else None  # None is default verification
+
+    async def get(self, endpoint: str, **params):
+        async with self.session.get(self.base_url + endpoint, params=params, headers=self.headers,
+                                    timeout=self.timeout, ssl=self.ssl) as resp:
+            resp.raise_for_status()
+            return await resp.json()
+
+    async def config(self) -> dict:
+        return await self.get("/rest/system/config")
+
+    async def device_stats(self) -> dict:
+        return await self.get("/rest/stats/device")
+
+    async def completion(self, device: str, folder: str) -> float:
+        return (await self.get("/rest/db/completion", device=device, folder=folder)).get("completion")
+
+    async def completions(self, device: str, folders: List[str]) -> Dict[str, float]:
+        """Get completion of many folders for a device.
+
+        The REST API has no multi-folder variant (without a folder it returns a single aggregate), so the
+        requests are issued concurrently instead."""
+        results = await asyncio.gather(*[self.completion(device, folder) for folder in folders])
+        return dict(zip(folders, results))
+
+
+# InfluxDB clients are kept for the whole process, so connections are reused between passes. Syncthing clients
+# belong to the HTTP session of run(), and are kept in a dict created there.
+_influx_cache: Dict[tuple, "InfluxDBClient"] = {}
+
+# Line protocol points waiting to be sent, per InfluxDB client. Full batches are sent while collecting. When passes
+# follow each other quickly, the rest is sent together with points of the next pass(es), but not older than this.
+MAX_PENDING_AGE = 30.0
+BATCH_SIZE = 5000
+# Number of per-Syncthing point lists that can wait in the queue between the collectors and the writer.
+MAX_QUEUED_RESULTS = 32
+_pending_points: Dict[tuple, List[str]] = {}
+_pending_since: Dict[tuple, float] = {}
+
+
+def get_syncthing_client(session: "aiohttp.ClientSession", clients: Dict[tuple, SyncthingClient],
+                         sync: SyncthingConfiguration) -> SyncthingClient:
+    params = sync.get_client_params()
+    key = tuple(params.values())  # Any change in the connection parameters needs a new client
+    conn = clients.get(key)
+    if conn is None:
+        conn = clients[key] = SyncthingClient(session, **params)
+    return conn
+
+
+def get_influx_client(influx_name: str, influx: InfluxDbConfiguration) -> "InfluxDBClient":
+    from influxdb import InfluxDBClient
+    key = (influx_name, influx)  # Frozen structs are hashed and compared by value
+    client = _influx_cache.get(key)
+    if client is None:
+        client = _influx_cache[key] = InfluxDBClient(**influx.get_client_params())
+    return client
 
 
 def error(message: str):
@@ -95,164 +185,326 @@ def error(message: str):
     raise SystemExit(-1)
 
 
+_TAG_ESCAPES = str.maketrans({"\\": "\\\\", " ": "\\ ", ",": "\\,", "=": "\\=", "\n": "\\n"})
+_STR_ESCAPES = str.maketrans({"\\": "\\\\", "\"": "\\\"", "\n": "\\n"})
+
+
+def _format_field(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return "%di" % value
+    if isinstance(value, float):
+        return repr(value)
+    return '"%s"' % str(value).translate(_STR_ESCAPES)
+
+
+def to_line(measurement: str, tags: dict, fields: dict, timestamp: int) -> str:
+    """Format a data point in InfluxDB line protocol.
+
+    Tags are sorted by key (as recommended for write performance), empty tags and None fields are left out."""
+    tag_str = ",".join(
+        "%s=%s" % (str(key).translate(_TAG_ESCAPES), str(value).translate(_TAG_ESCAPES))
+        for key, value in sorted(tags.items()) if value is not None and value != ""
+    )
+    field_str = ",".join(
+        "%s=%s" % (str(key).translate(_TAG_ESCAPES), _format_field(value))
+        for key, value in fields.items() if value is not None
+    )
+    head = measurement.translate(_TAG_ESCAPES)
+    if tag_str:
+        head += "," + tag_str
+    return "%s %s %d" % (head, field_str, timestamp)
+
+
+_FRACTION_RE = re.compile(r"\.(\d+)")
+
+
+def parse_datetime(value: str) -> datetime.datetime:
+    """Parse an RFC 3339 time string, as sent by Syncthing.
+
+    Syncthing sends up to nanosecond precision, and may use Z for UTC. Both are normalized to a format that
+    datetime.fromisoformat() understands, which is much faster than a generic date parser."""
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    value = _FRACTION_RE.sub(lambda m: "." + (m.group(1) + "000000")[:6], value, count=1)
+    return datetime.datetime.fromisoformat(value)
+
+
+_info_lock = threading.Lock()
+_silent = False
+
+
 def info(*values):
-    if not args.silent:
-        print(*values)
-
-
-def main():
-    # Collect data
-    points = []
-    for sync in config.syncthings.values():
-        info("    Connect syncthing %s" % sync.name)
-        proto_tags = {"cfg_name": sync.name}
-        if sync.tags:
-            proto_tags.update(sync.tags)
-
-        conn_args = sync.get_client_params()
-        q_started = time.time()
-
-        conn = syncthing.Syncthing(**conn_args)
-        now = datetime.datetime.now(tz=pytz.UTC)
-        sync_cfg = conn.system.config()
-        # My own device id
-        my_device = sync_cfg["defaults"]["folder"]["devices"][0]
-        my_id = my_device["deviceID"]
-        proto_tags["my_id"] = my_id
-        # Collect device stats
-        device_stats = conn.stats.device()
-        # List all remote devices
-        remote_devices = []
-        for device in sync_cfg["devices"]:
-            device_id = device["deviceID"]
-            if device_id == my_id:
-                proto_tags["my_name"] = device["name"]
-            else:
-                stats = device_stats[device_id]
-                last_seen = syncthing.parse_datetime(stats["lastSeen"])
-                last_seen_since = now - last_seen
-                remote_devices.append({
-                    "tags": {
-                        "id": device["deviceID"],  # Device ID
-                        "name": device["name"],  # Device Name
-                    },
-                    "fields": {
-                        "last_seen_since_sec": last_seen_since.total_seconds(),  # Number of seconds last seen
-                    }
-                })
-        # Folders
-        folders = []
-        for folder in sync_cfg["folders"]:
-            # Get completion for my own device
-            completion = conn.database.completion(my_id, folder["id"])
-            folders.append({
-                "tags": {"id": folder["id"], "label": folder["label"], "path": folder["path"]},
-                "fields": {"completion": completion},
-            })
-        q_elapsed = time.time() - q_started
-        proto_fields = {"q_elapsed": q_elapsed}
-
-        # Create data points for devices
-        for device in remote_devices:
-            tags = copy.copy(proto_tags)
-            tags.update(device["tags"])
-            fields = copy.copy(proto_fields)
-            fields.update(device["fields"])
-            point = dict(measurement=config.measurements.devices, tags=tags, fields=fields)
-            points.append(point)
-
-        # Create points for folders
-        for folder in folders:
-            tags = copy.copy(proto_tags)
-            tags.update(folder["tags"])
-            fields = copy.copy(proto_fields)
-            fields.update(folder["fields"])
-            point = dict(measurement=config.measurements.folders, tags=tags, fields=fields)
-            points.append(point)
-
-    if not points:
-        return
+    if not _silent:
+        with _info_lock:
+            print(*values)
+
+
+async def collect(session: "aiohttp.ClientSession", clients: Dict[tuple, SyncthingClient],
+                  sync: SyncthingConfiguration, measurements: MeasurementConfiguration) -> List[str]:
+    """Collect data points from a single Syncthing instance, in line protocol format."""
+    info("    Connect syncthing %s" % sync.name)
+    proto_tags = {"cfg_name": sync.name}
+    if sync.tags:
+        proto_tags.update(sync.tags)
+
+    q_started = time.monotonic()
+
+    conn = get_syncthing_client(session, clients, sync)
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    sync_cfg = await conn.config()
+    # My own device id
+    my_device = sync_cfg["defaults"]["folder"]["devices"][0]
+    my_id = my_device["deviceID"]
+    proto_tags["my_id"] = my_id
+    # Collect device stats
+    device_stats = await conn.device_stats()
+    # Folders, get completion for my own device
+    completions = await conn.completions(my_id, [folder["id"] for folder in sync_cfg["folders"]])
+    q_elapsed = time.monotonic() - q_started
+    timestamp = time.time_ns()  # Nanosecond precision, passes may be less than a second apart
+
+    devices_by_id = {device["deviceID"]: device for device in sync_cfg["devices"]}
+    # My own device name
+    if my_id in devices_by_id:
+        proto_tags["my_name"] = devices_by_id[my_id]["name"]
+
+    # Create data points for all remote devices, straight into line protocol
+    points = [
+        to_line(
+            measurements.devices,
+            {
+                **proto_tags,
+                "id": device_id,  # Device ID
+                "name": device["name"],  # Device Name
+            },
+            {
+                "q_elapsed": q_elapsed,
+                # Number of seconds last seen
+                "last_seen_since_sec": (now - parse_datetime(device_stats[device_id]["lastSeen"])).total_seconds(),
+            },
+            timestamp
+        )
+        for device_id, device in devices_by_id.items() if device_id != my_id
+    ]
+
+    # Create points for folders
+    points.extend(
+        to_line(
+            measurements.folders,
+            {**proto_tags, "id": folder["id"], "label": folder["label"], "path": folder["path"]},
+            {"q_elapsed": q_elapsed, "completion": completions[folder["id"]]},
+            timestamp
+        )
+        for folder in sync_cfg["folders"]
+    )
+
+    return points
+
+
+def send_pending(args: argparse.Namespace, influx_name: str, influx: InfluxDbConfiguration, key: tuple):
+    """Send (and forget) pending points of an InfluxDB instance."""
+    from requests.exceptions import RequestException
+    from influxdb.exceptions import InfluxDBClientError, InfluxDBServerError
+
+    pending = _pending_points.pop(key)
+    _pending_since.pop(key, None)
+    info("    Sending %d point(s) to influxdb %s" % (len(pending), influx_name))
+    try:
+        client = get_influx_client(influx_name, influx)
+        client.write_points(pending, time_precision="n", batch_size=BATCH_SIZE, protocol="line")
+    except (RequestException, InfluxDBClientError, InfluxDBServerError, OSError) as e:
+        if args.halt_on_send_error:
+            raise
+        elif args.verbose:
+            import traceback
+            traceback.print_exc(file=sys.stderr)
+        else:
+            sys.stderr.write("Cannot send to influxdb %s: %r\n" % (influx_name, e))
+            sys.stderr.flush()
+
+
+def flush_pending(args: argparse.Namespace, keep=frozenset()):
+    """Send pending points of all InfluxDB instances, except for the keys to keep."""
+    for key in list(_pending_points):
+        if key in keep:
+            continue
+        if _pending_points[key]:
+            influx_name, influx = key
+            send_pending(args, influx_name, influx, key)
+        else:
+            del _pending_points[key]
+            _pending_since.pop(key, None)
+
+
+async def write_queued(args: argparse.Namespace, config: AppConfiguration, points_queue: asyncio.Queue,
+                       flush: bool):
+    """Send points from the queue to all InfluxDB instances of the configuration, until None is received.
+
+    Full batches are sent as soon as they are available. The rest is sent at the end, unless flush is not set and
+    it can wait for the next pass. The InfluxDB client is blocking, so sending runs in a worker thread."""
+    failure = None
+    while True:
+        points = await points_queue.get()
+        if points is None:
+            break
+        if failure is not None:
+            continue  # Keep draining, so that collectors are never blocked
+        for influx_name, influx in config.influxes.items():
+            key = (influx_name, influx)
+            pending = _pending_points.setdefault(key, [])
+            if points and not pending:
+                _pending_since[key] = time.monotonic()
+            pending.extend(points)
+            if len(pending) >= BATCH_SIZE:
+                try:
+                    await asyncio.to_thread(send_pending, args, influx_name, influx, key)
+                except Exception as e:
+                    failure = e
+                    break
+    if failure is not None:
+        raise failure
 
     for influx_name, influx in config.influxes.items():
-        info("    Sending %d point(s) to influxdb %s" % (len(points), influx_name))
+        key = (influx_name, influx)
+        if not _pending_points.get(key):
+            continue
+        age = time.monotonic() - _pending_since[key]
+        if flush or age + args.wait >= MAX_PENDING_AGE:
+            await asyncio.to_thread(send_pending, args, influx_name, influx, key)
+
+
+async def main(args: argparse.Namespace, config: AppConfiguration, session: "aiohttp.ClientSession",
+               clients: Dict[tuple, SyncthingClient], flush: bool):
+    """Collect and send data points for the current configuration.
+
+    Points are only kept back for a later pass when flush is not set and the next pass is due soon enough."""
+
+    async def collect_into_queue(sync: SyncthingConfiguration):
+        await points_queue.put(await collect(session, clients, sync, config.measurements))
+
+    points_queue = asyncio.Queue(maxsize=MAX_QUEUED_RESULTS)
+    writer = asyncio.create_task(write_queued(args, config, points_queue, flush))
+    try:
+        # Collect data from all Syncthing instances concurrently
+        await asyncio.gather(*[collect_into_queue(sync) for sync in config.syncthings.values()])
+    finally:
+        await points_queue.put(None)
+        await writer
+
+
+async def run(args: argparse.Namespace, parser: argparse.ArgumentParser, config_files: List[str]):
+    """Run all passes, with one HTTP session for all Syncthing instances."""
+    import aiohttp
+
+    connector = aiohttp.TCPConnector(limit=64, limit_per_host=16, keepalive_timeout=120)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        # Syncthing clients by connection parameters, valid as long as the session is open
+        clients: Dict[tuple, SyncthingClient] = {}
+        # Stop on SIGTERM the same way as on Ctrl+C (not available on Windows)
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except (NotImplementedError, RuntimeError):
+            pass
         try:
-            influx = config.influxes[influx_name]
-            client = InfluxDBClient(**asdict(influx))
-            client.write_points(points)
-        except:
-            if args.halt_on_send_error:
-                raise
-            else:
-                traceback.print_exc(file=sys.stderr)
-
-
-parser = argparse.ArgumentParser(description='Monitor your Syncthing instances with influxdb.')
-
-parser.add_argument('-c', "--config", dest="config", default=None,
-                    help="Configuration file for application. Default is syncflux.yml. "
-                         "See syncflux_example.yml for an example.")
-parser.add_argument("--config-dir", dest="config_dir", default=None,
-                    help="Configuration directory. All config files with .yml extension will be processed one by one.")
-parser.add_argument('-n', "--count", dest="count", default=1, type=int,
-                    help="Number of test runs. Default is one. Use -1 to run indefinitely.")
-parser.add_argument('-w', "--wait", dest="wait", default=60, type=float,
-                    help="Number of seconds between test runs.")
-parser.add_argument("-s", "--silent", dest='silent', action="store_true", default=False,
-                    help="Supress all messages except errors.")
-parser.add_argument("-v", "--verbose", dest='verbose', action="store_true", default=False,
-                    help="Be verbose."
-                    )
-parser.add_argument("--halt-on-send-error", dest="halt_on_send_error", default=False, action="store_true",
-                    help="Halt when cannot send data to influxdb. The default is to ignore the error.")
-
-args = parser.parse_args()
-if args.silent and args.verbose:
-    parser.error("Cannot use --silent and --verbose at the same time.")
-if args.config is None:
-    args.config = "syncflux.yml"
-if (args.config is not None) and (args.config_dir is not None):
-    parser.error("You must give either --config or --config-dir (exactly one of them)")
-
-if args.count == 0:
-    parser.error("Test run count cannot be zero.")
-
-if args.wait <= 0:
-    parser.error("Wait time must be positive.")
-
-if args.config:
-    config_files = [args.config]
-else:
-    config_files = []
-    for file_name in sorted(os.listdir(args.config_dir)):
-        ext = os.path.splitext(file_name)[1]
-        if ext.lower() == ".yml":
-            fpath = os.path.join(args.config_dir, file_name)
-            config_files.append(fpath)
-
-index = 0
-while args.count < 0 or index < args.count:
-
-    if args.count != 1:
-        info("Pass #%d started" % (index + 1))
-
-    started = time.time()
-    for config_file in config_files:
-        if not os.path.isfile(config_file):
-            parser.error("Cannot open %s" % config_file)
-        config = load_app_config(open(config_file, "r"))
-        main()
-    elapsed = time.time() - started
-
-    index += 1
-
-    last_one = (args.count > 0) and (index == args.count)
-    if not last_one:
-        remaining = args.wait - elapsed
-        if remaining > 0:
-            if not args.silent:
-                info("Pass #%d elapsed %.2f sec, waiting %.2f sec for next." % (index, elapsed, remaining))
-            time.sleep(args.wait)
+            index = 0
+            # Passes are scheduled against absolute deadlines, so the time spent in a pass does not add up as drift.
+            next_start = time.monotonic()
+            while args.count < 0 or index < args.count:
+
+                if args.count != 1:
+                    info("Pass #%d started" % (index + 1))
+
+                last_one = (args.count > 0) and (index + 1 == args.count)
+                started = time.monotonic()
+                influx_keys = set()
+                for config_file in config_files:
+                    try:
+                        config = load_app_config_file(config_file)
+                    except OSError as e:
+                        parser.error("Cannot open %s: %s" % (config_file, e.strerror))
+                    influx_keys.update(config.influxes.items())
+                    await main(args, config, session, clients, flush=last_one)
+                # InfluxDB configurations that changed or were removed: send what was kept back for them, and forget
+                # their clients.
+                await asyncio.to_thread(flush_pending, args, influx_keys)
+                for key in list(_influx_cache):
+                    if key not in influx_keys:
+                        del _influx_cache[key]
+                elapsed = time.monotonic() - started
+
+                index += 1
+
+                if not last_one:
+                    next_start += args.wait
+                    remaining = next_start - time.monotonic()
+                    if remaining > 0:
+                        if not args.silent:
+                            info("Pass #%d elapsed %.2f sec, waiting %.2f sec for next." % (index, elapsed, remaining))
+                        await asyncio.sleep(remaining)
+                    else:
+                        # Overrun, start the next pass now instead of trying to catch up
+                        next_start = time.monotonic()
+                else:
+                    info("Pass #%d elapsed %.2f sec" % (index, elapsed))
+
+                info("")
+        finally:
+            # Do not lose points kept back for the next pass when stopped
+            flush_pending(args)
+
+
+def _cli():
+    global _silent
+    parser = argparse.ArgumentParser(description='Monitor your Syncthing instances with influxdb.')
+
+    parser.add_argument('-c', "--config", dest="config", default=None,
+                        help="Configuration file for application. Default is syncflux.yml. "
+                             "See syncflux_example.yml for an example.")
+    parser.add_argument("--config-dir", dest="config_dir", default=None,
+                        help="Configuration directory. "
+                             "All config files with .yml extension will be processed one by one.")
+    parser.add_argument('-n', "--count", dest="count", default=1, type=int,
+                        help="Number of test runs. Default is one. Use -1 to run indefinitely.")
+    parser.add_argument('-w', "--wait", dest="wait", default=60, type=float,
+                        help="Number of seconds between test runs.")
+    parser.add_argument("-s", "--silent", dest='silent', action="store_true", default=False,
+                        help="Supress all messages except errors.")
+    parser.add_argument("-v", "--verbose", dest='verbose', action="store_true", default=False,
+                        help="Be verbose."
+                        )
+    parser.add_argument("--halt-on-send-error", dest="halt_on_send_error", default=False, action="store_true",
+                        help="Halt when cannot send data to influxdb. The default is to ignore the error.")
+
+    args = parser.parse_args()
+    _silent = args.silent
+    if args.silent and args.verbose:
+        parser.error("Cannot use --silent and --verbose at the same time.")
+    if (args.config is not None) and (args.config_dir is not None):
+        parser.error("You must give either --config or --config-dir (exactly one of them)")
+    if args.config is None and args.config_dir is None:
+        args.config = "syncflux.yml"
+
+    if args.count == 0:
+        parser.error("Test run count cannot be zero.")
+
+    if args.wait <= 0:
+        parser.error("Wait time must be positive.")
+
+    if args.config:
+        config_files = [args.config]
     else:
-        info("Pass #%d elapsed %.2f sec" % (index, elapsed))
+        with os.scandir(args.config_dir) as entries:
+            config_files = sorted(
+                entry.path for entry in entries if entry.name.lower().endswith(".yml") and entry.is_file()
+            )
+
+    try:
+        asyncio.run(run(args, parser, config_files))
+    except asyncio.CancelledError:
+        pass  # Stopped with SIGTERM
+
 
-    info("")
+if __name__ == "__main__":
+    _cli()